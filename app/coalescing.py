@@ -0,0 +1,103 @@
+"""Slučování souběžných identických požadavků (single-flight).
+
+Když se několik dashboardů obnoví současně, každý požadavek na drahý
+endpoint by jinak sám prošel celou tabulku. Identické požadavky, které
+běží ve stejnou chvíli, proto čekají na jeden společný výpočet.
+Klíč tvoří routa, parametry a verze dat, takže po zápisu se nikdy
+nevrátí výsledek spočítaný nad starými daty.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_data_version = 0
+_data_version_lock = threading.Lock()
+
+
+def current_data_version() -> int:
+    """Aktuální verze dat v tabulce spotřeby"""
+    return _data_version
+
+
+def mark_data_changed() -> int:
+    """Zvýšení verze dat - volat po každém úspěšném zápisu"""
+    global _data_version
+    with _data_version_lock:
+        _data_version += 1
+        return _data_version
+
+
+class SingleFlight:
+    """Sdílení jednoho běžícího výpočtu mezi identickými požadavky"""
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple, asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "executions": 0, "coalesced": 0, "errors": 0}
+        )
+
+    async def run(self, route: str, params: Dict[str, Hashable], fn: Callable[[Session], Any]) -> Any:
+        """Spuštění `fn(db)` ve threadpoolu, případně připojení k již běžícímu výpočtu
+
+        Výpočet dostává vlastní databázovou session, protože jeho výsledek
+        sdílí více požadavků a nesmí záviset na životnosti jednoho z nich.
+        """
+        key = (route, tuple(sorted(params.items())), current_data_version())
+        stats = self._stats[route]
+        stats["requests"] += 1
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            stats["coalesced"] += 1
+        else:
+            stats["executions"] += 1
+            future = asyncio.ensure_future(run_in_threadpool(self._execute, fn))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda f: self._finish(key, f))
+        try:
+            # shield - zrušení jednoho čekatele nesmí zrušit výpočet ostatním
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Počítá se každý požadavek, který chybu dostal, včetně sloučených
+            stats["errors"] += 1
+            raise
+
+    def _finish(self, key: Tuple, future: asyncio.Future) -> None:
+        self._in_flight.pop(key, None)
+        # Vyzvednutí výjimky, aby asyncio nehlásilo "exception was never retrieved",
+        # pokud všichni čekatelé mezitím odešli
+        if not future.cancelled():
+            future.exception()
+
+    @staticmethod
+    def _execute(fn: Callable[[Session], Any]) -> Any:
+        db = SessionLocal()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Počítadla pro jednotlivé routy"""
+        routes = {route: dict(counters) for route, counters in self._stats.items()}
+        return {
+            "in_flight": len(self._in_flight),
+            "data_version": current_data_version(),
+            "total_requests": sum(c["requests"] for c in routes.values()),
+            "total_coalesced": sum(c["coalesced"] for c in routes.values()),
+            "routes": routes,
+        }
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,73 @@
+"""Definice úloh na pozadí a jejich konfigurace z environment variables"""
+import logging
+import os
+from datetime import date
+from typing import Any, Dict
+
+from sqlalchemy.orm import Session
+
+from .coalescing import current_data_version, mark_data_changed
+from .routers.grafy import compute_chart_data, compute_chart_summary, compute_year_over_year
+from .routers.missing_data import compute_missing_data_suggestions, insert_suggestions
+from .scheduler import JobScheduler
+from .storage import RETENTION_MONTHS, compact_readings, retention_horizon
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+GAP_FILL_INTERVAL_SECONDS = float(os.getenv("GAP_FILL_INTERVAL_SECONDS", "3600"))
+GAP_FILL_AUTO_CREATE = os.getenv("GAP_FILL_AUTO_CREATE", "false").lower() == "true"
+PRECOMPUTE_DEBOUNCE_SECONDS = float(os.getenv("PRECOMPUTE_DEBOUNCE_SECONDS", "2"))
+PRECOMPUTE_INTERVAL_SECONDS = float(os.getenv("PRECOMPUTE_INTERVAL_SECONDS", "300"))
+# Maximální stáří předpočítaných výsledků - rezerva pro jeden vynechaný pravidelný přepočet
+RESULT_MAX_AGE_SECONDS = 2 * PRECOMPUTE_INTERVAL_SECONDS
+COMPACTION_INTERVAL_SECONDS = float(os.getenv("COMPACTION_INTERVAL_SECONDS", "86400"))
+
+# Období, pro která se předpočítávají data grafů (odpovídají tlačítkům na stránce Grafy)
+CHART_PERIODS = ("year", "2years", "all")
+
+
+def register_jobs(scheduler: JobScheduler) -> None:
+    """Registrace všech úloh aplikace do plánovače"""
+
+    def gap_fill(db: Session) -> Dict[str, Any]:
+        """Detekce mezer v datech, volitelně i automatické doplnění interpolovaných záznamů"""
+        version = current_data_version()
+        suggestions = compute_missing_data_suggestions(db)
+        created = 0
+        if suggestions and GAP_FILL_AUTO_CREATE:
+            created = insert_suggestions(db, suggestions)
+            if created:
+                mark_data_changed()
+                logger.info("Automaticky doplněno %d chybějících záznamů", created)
+        if not created:
+            scheduler.publish("missing-data/suggestions", {}, suggestions, version, RESULT_MAX_AGE_SECONDS)
+        return {"gaps": len(suggestions), "created": created}
+
+    def precompute(db: Session) -> Dict[str, Any]:
+        """Přepočet návrhů a agregací po změně dat a v pravidelném intervalu"""
+        version = current_data_version()
+        max_age = RESULT_MAX_AGE_SECONDS
+        suggestions = compute_missing_data_suggestions(db)
+        scheduler.publish("missing-data/suggestions", {}, suggestions, version, max_age)
+        for period in CHART_PERIODS:
+            chart_json = compute_chart_data(db, period).model_dump_json()
+            scheduler.publish("grafy/data", {"period": period}, chart_json, version, max_age)
+        scheduler.publish("grafy/yoy", {}, compute_year_over_year(db), version, max_age)
+        scheduler.publish("grafy/summary", {}, compute_chart_summary(db), version, max_age)
+        return {"data_version": version, "suggestions": len(suggestions)}
+
+    def compaction(db: Session) -> Dict[str, Any]:
+        """Zhuštění odečtů starších než RETENTION_MONTHS do archivu"""
+        result = compact_readings(db, retention_horizon(date.today(), RETENTION_MONTHS))
+        if result["moved"]:
+            mark_data_changed()
+        return result
+
+    scheduler.register("gap_fill", gap_fill, interval=GAP_FILL_INTERVAL_SECONDS)
+    scheduler.register(
+        "precompute", precompute, interval=PRECOMPUTE_INTERVAL_SECONDS, debounce=PRECOMPUTE_DEBOUNCE_SECONDS
+    )
+    if RETENTION_MONTHS > 0:
+        scheduler.register("compaction", compaction, interval=COMPACTION_INTERVAL_SECONDS)
+
@@ -1,16 +1,21 @@
 import logging
 import os
+from contextlib import asynccontextmanager
 from datetime import date
 
-from fastapi import FastAPI, Request, Depends
+from fastapi import FastAPI, Request, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from .coalescing import single_flight
 from .database import get_db, engine
-from .routers import spotreba, grafy, missing_data
+from .jobs import SCHEDULER_ENABLED, register_jobs
+from .routers import spotreba, grafy, missing_data, jobs
+from .scheduler import scheduler
+from .storage import RETENTION_MONTHS, prepare_archive
 
 logging.basicConfig(
     level=logging.INFO,
@@ -19,12 +24,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Příprava archivní tabulky a spuštění/zastavení plánovače úloh na pozadí"""
+    # Bez retence se nic nevytváří - archiv se čte, jen pokud tabulka už existuje
+    if RETENTION_MONTHS > 0:
+        prepare_archive(engine)
+    if SCHEDULER_ENABLED:
+        register_jobs(scheduler)
+        scheduler.start()
+    yield
+    if scheduler.started:
+        await scheduler.stop()
+
 app = FastAPI(
     title="Evidování spotřeby",
     description="Aplikace pro sledování spotřeby energií (elektřina, plyn, voda)",
     version="2.1.0",
     docs_url=None,
     redoc_url=None,
+    lifespan=lifespan,
 )
 
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "").split(",")
@@ -60,14 +79,15 @@ templates = Jinja2Templates(directory="app/templates")
 app.include_router(spotreba.router, prefix="/api", tags=["spotreba"])
 app.include_router(grafy.router, prefix="/api", tags=["grafy"])
 app.include_router(missing_data.router, prefix="/api", tags=["missing-data"])
+app.include_router(jobs.router, prefix="/api", tags=["jobs"])
 
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request, db: Session = Depends(get_db)):
     """Hlavní stránka s přehledem dat"""
-    from .routers.spotreba import get_spotreba_list
+    from .routers.spotreba import fetch_spotreba_rows
     
     # Získání dat pro hlavní stránku
-    spotreba_data = await get_spotreba_list(db=db, limit=12, offset=0, source_filter=None)
+    spotreba_data = fetch_spotreba_rows(db, limit=12, offset=0, source_filter=None)
     
     return templates.TemplateResponse("index.html", {
         "request": request,
@@ -78,9 +98,8 @@ async def root(request: Request, db: Session = Depends(get_db)):
 @app.get("/evidovat", response_class=HTMLResponse)
 async def evidovat_page(request: Request, db: Session = Depends(get_db)):
     """Stránka pro přidávání nových záznamů"""
-    from .models import Spotreba
-    from sqlalchemy import desc
-    latest = db.query(Spotreba).order_by(desc(Spotreba.datum)).first()
+    from .storage import fetch_readings
+    latest = next(iter(fetch_readings(db, newest_first=True, limit=1)), None)
     return templates.TemplateResponse("evidovat.html", {
         "request": request,
         "app_title": "Evidování spotřeby",
@@ -95,6 +114,10 @@ async def edit_page(request: Request, spotreba_id: int, db: Session = Depends(ge
     
     spotreba_data = await get_spotreba(spotreba_id=spotreba_id, db=db)
     
+    # Archivované záznamy (záporné id) jsou jen pro čtení - formulář by při uložení selhal
+    if spotreba_data.id < 0:
+        raise HTTPException(status_code=400, detail="Archivovaný záznam nelze měnit")
+    
     return templates.TemplateResponse("edit.html", {
         "request": request,
         "spotreba": spotreba_data,
@@ -137,6 +160,11 @@ async def health_check():
             content={"status": "error", "database": "disconnected"},
         )
 
+@app.get("/api/stats/coalescing")
+async def coalescing_stats():
+    """Počítadla sloučených souběžných požadavků (single-flight)"""
+    return single_flight.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Date, Float, Boolean
+from sqlalchemy import Column, Integer, Date, DateTime, Float, Boolean
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -16,3 +16,21 @@ class Spotreba(Base):
     
     def __repr__(self):
         return f"<Spotreba(id={self.id}, datum={self.datum}, elektromer_vysoky={self.elektromer_vysoky})>"
+
+class SpotrebaArchiv(Base):
+    """Model pro archivní tabulku - staré odečty zhuštěné na hraniční odečty měsíců"""
+    __tablename__ = "spotreba_archiv"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Id z tabulky spotreba v okamžiku archivace - není unikátní, MySQL/MariaDB může id znovu použít
+    original_id = Column(Integer, nullable=False, index=True)
+    datum = Column(Date, nullable=False, unique=True, index=True)
+    elektromer_vysoky = Column(Float, nullable=False)
+    elektromer_nizky = Column(Float, nullable=False)
+    plynomer = Column(Float, nullable=False)
+    vodomer = Column(Float, nullable=False)
+    source = Column(Boolean, default=False, nullable=False)  # Zachovaný původ dat z tabulky spotreba
+    archived_at = Column(DateTime, server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<SpotrebaArchiv(id={self.id}, original_id={self.original_id}, datum={self.datum}, elektromer_vysoky={self.elektromer_vysoky})>"
@@ -1,73 +1,53 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
 from typing import List, Dict, Any, Optional
 from datetime import date, timedelta
 from collections import defaultdict
+from ..coalescing import single_flight
 from ..database import get_db
-from ..models import Spotreba
+from ..scheduler import scheduler
 from ..schemas import ChartData
+from ..storage import count_readings, fetch_readings
 
 router = APIRouter()
 
 @router.get("/grafy/data", response_model=ChartData)
 async def get_chart_data(
-    db: Session = Depends(get_db),
     period: Optional[str] = Query(None, description="Časové období: 'year' (poslední rok), '2years' (poslední 2 roky), 'all' (všechno)")
 ):
     """Získání dat pro grafy spotřeby - zobrazuje kumulativní hodnoty měřičů (celkové stavy)"""
+    content = scheduler.cached("grafy/data", {"period": period})
+    if content is None:
+        content = await single_flight.run(
+            "grafy/data", {"period": period}, lambda db: compute_chart_data(db, period).model_dump_json()
+        )
+    # Hotový JSON - bez opakované validace přes response_model
+    return Response(content=content, media_type="application/json")
+
+def compute_chart_data(db: Session, period: Optional[str]) -> ChartData:
+    """Výpočet dat pro grafy (bez vazby na HTTP požadavek)"""
     
     # Určení časového filtru
     if period == "year":
         # Poslední rok
-        cutoff_date = date.today() - timedelta(days=365)
-        query = db.query(Spotreba).filter(Spotreba.datum >= cutoff_date)
+        since = date.today() - timedelta(days=365)
     elif period == "2years":
         # Poslední 2 roky
-        cutoff_date = date.today() - timedelta(days=730)
-        query = db.query(Spotreba).filter(Spotreba.datum >= cutoff_date)
+        since = date.today() - timedelta(days=730)
     else:
         # Všechno (výchozí)
-        query = db.query(Spotreba)
-    
-    # Získání záznamů seřazených podle data
-    records = query.order_by(Spotreba.datum.desc()).all()
-    
-    if not records:
-        return ChartData(
-            labels=[],
-            elektromer_vysoky=[],
-            elektromer_nizky=[],
-            plynomer=[],
-            vodomer=[],
-            source_flags=[]
-        )
+        since = None
     
-    # Seřazení od nejstaršího k nejnovějšímu
-    records = sorted(records, key=lambda x: x.datum)
+    # Prosté řádky z horké tabulky i archivu seřazené od nejstaršího k nejnovějšímu
+    rows = fetch_readings(db, since=since)
     
-    # Příprava dat pro grafy
-    labels = []
-    elektromer_vysoky = []
-    elektromer_nizky = []
-    plynomer = []
-    vodomer = []
-    source_flags = []
-    
-    for i, record in enumerate(records):
-        # Formátování data pro zobrazení
-        date_str = record.datum.strftime('%d.%m.%Y')
-        labels.append(date_str)
-        
-        # Použití kumulativních hodnot (celkové stavy měřičů)
-        elektromer_vysoky.append(record.elektromer_vysoky)
-        elektromer_nizky.append(record.elektromer_nizky)
-        plynomer.append(record.plynomer)
-        vodomer.append(record.vodomer)
-        source_flags.append(record.source)
+    # Transpozice řádků na sloupce pro jednotlivé série grafu (pořadí dle READING_COLUMNS)
+    _, datums, elektromer_vysoky, elektromer_nizky, plynomer, vodomer, source_flags = (
+        zip(*rows) if rows else ([],) * 7
+    )
     
     return ChartData(
-        labels=labels,
+        labels=[d.strftime('%d.%m.%Y') for d in datums],
         elektromer_vysoky=elektromer_vysoky,
         elektromer_nizky=elektromer_nizky,
         plynomer=plynomer,
@@ -76,9 +56,16 @@ async def get_chart_data(
     )
 
 @router.get("/grafy/yoy")
-async def get_year_over_year(db: Session = Depends(get_db)):
+async def get_year_over_year():
     """Meziroční porovnání spotřeby -- pro každý rok vypočítá roční spotřebu"""
-    records = db.query(Spotreba).order_by(Spotreba.datum.asc()).all()
+    cached = scheduler.cached("grafy/yoy", {})
+    if cached is not None:
+        return cached
+    return await single_flight.run("grafy/yoy", {}, compute_year_over_year)
+
+def compute_year_over_year(db: Session) -> Dict[str, Any]:
+    """Výpočet meziročního porovnání (bez vazby na HTTP požadavek)"""
+    records = fetch_readings(db)
     if not records:
         return {"years": []}
 
@@ -105,19 +92,26 @@ async def get_year_over_year(db: Session = Depends(get_db)):
 @router.get("/grafy/summary")
 async def get_chart_summary(db: Session = Depends(get_db)):
     """Získání souhrnných statistik pro grafy"""
+    cached = scheduler.cached("grafy/summary", {})
+    if cached is not None:
+        return cached
+    return compute_chart_summary(db)
+
+def compute_chart_summary(db: Session) -> Dict[str, Any]:
+    """Výpočet souhrnných statistik (bez vazby na HTTP požadavek)"""
     
-    # Celkový počet záznamů
-    total_records = db.query(Spotreba).count()
+    # Počet manuálních vs. automatických záznamů (horká tabulka i archiv)
+    manual_records = count_readings(db, source=False)
+    auto_records = count_readings(db, source=True)
     
-    # Počet manuálních vs. automatických záznamů
-    manual_records = db.query(Spotreba).filter(Spotreba.source == False).count()
-    auto_records = db.query(Spotreba).filter(Spotreba.source == True).count()
+    # Celkový počet záznamů
+    total_records = manual_records + auto_records
     
     # Poslední záznam
-    last_record = db.query(Spotreba).order_by(Spotreba.datum.desc()).first()
+    last_record = next(iter(fetch_readings(db, newest_first=True, limit=1)), None)
     
     # První záznam
-    first_record = db.query(Spotreba).order_by(Spotreba.datum.asc()).first()
+    first_record = next(iter(fetch_readings(db, limit=1)), None)
     
     return {
         "total_records": total_records,
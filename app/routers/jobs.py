@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException
+
+from ..scheduler import scheduler
+
+router = APIRouter()
+
+@router.get("/jobs")
+async def get_jobs():
+    """Stav úloh na pozadí včetně doby trvání jejich běhů"""
+    return {
+        "scheduler_running": scheduler.started,
+        "jobs": [job.status() for job in scheduler.jobs()]
+    }
+
+@router.post("/jobs/{job_name}/run")
+async def run_job(job_name: str):
+    """Okamžité spuštění úlohy mimo její plán"""
+    if scheduler.get(job_name) is None:
+        raise HTTPException(status_code=404, detail="Úloha nebyla nalezena")
+    job = await scheduler.run_job(job_name)
+    return job.status()
@@ -2,12 +2,14 @@ import logging
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
 from typing import List
 from datetime import date, timedelta
+from ..coalescing import mark_data_changed
 from ..database import get_db
 from ..models import Spotreba
+from ..scheduler import scheduler
 from ..schemas import MissingDataSuggestion, SpotrebaCreate
+from ..storage import ARCHIVED_MONTH_DETAIL, fetch_readings, is_archived_month, reading_exists
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +19,17 @@ router = APIRouter()
 async def get_missing_data_suggestions(db: Session = Depends(get_db)):
     """Získání návrhů pro doplnění chybějících dat"""
     
+    # Přednostně hotový výsledek z plánovače, pokud odpovídá aktuálním datům
+    cached = scheduler.cached("missing-data/suggestions", {})
+    if cached is not None:
+        return cached
+    return compute_missing_data_suggestions(db)
+
+def compute_missing_data_suggestions(db: Session) -> List[MissingDataSuggestion]:
+    """Výpočet návrhů chybějících dat (bez vazby na HTTP požadavek)"""
+    
     # Získání posledních 12 záznamů seřazených podle data
-    records = db.query(Spotreba).order_by(Spotreba.datum.desc()).limit(12).all()
+    records = fetch_readings(db, newest_first=True, limit=12)
     
     if len(records) < 2:
         return []
@@ -78,9 +89,8 @@ async def get_missing_data_suggestions(db: Session = Depends(get_db)):
                 suggested_plynomer = current_record.plynomer + (monthly_plynomer * month_index)
                 suggested_vodomer = current_record.vodomer + (monthly_vodomer * month_index)
                 
-                # Kontrola, zda už neexistuje záznam pro toto datum
-                existing = db.query(Spotreba).filter(Spotreba.datum == suggested_date).first()
-                if not existing:
+                # Kontrola, zda už neexistuje záznam pro toto datum a nepatří do archivu
+                if not is_archived_month(suggested_date) and not reading_exists(db, suggested_date):
                     suggestions.append(MissingDataSuggestion(
                         datum=suggested_date,
                         elektromer_vysoky=round(suggested_elektromer_vysoky, 2),
@@ -101,12 +111,27 @@ async def create_missing_data_suggestions(db: Session = Depends(get_db)):
     if not suggestions:
         return {"message": "Žádné chybějící záznamy k doplnění", "created": 0}
     
+    try:
+        created_count = insert_suggestions(db, suggestions)
+    except Exception:
+        db.rollback()
+        logger.exception("Chyba při hromadném vytváření chybějících záznamů")
+        raise HTTPException(status_code=500, detail="Chyba při ukládání do databáze")
+    
+    mark_data_changed()
+    logger.info("Hromadně vytvořeno %d chybějících záznamů", created_count)
+    return {
+        "message": f"Bylo vytvořeno {created_count} chybějících záznamů",
+        "created": created_count
+    }
+
+def insert_suggestions(db: Session, suggestions: List[MissingDataSuggestion]) -> int:
+    """Uložení navržených záznamů, které ještě neexistují; vrací počet vytvořených"""
     created_count = 0
     
     for suggestion in suggestions:
-        # Kontrola, zda už neexistuje záznam pro toto datum
-        existing = db.query(Spotreba).filter(Spotreba.datum == suggestion.datum).first()
-        if not existing:
+        # Kontrola, zda už neexistuje záznam pro toto datum (návrh mohl mezitím zestárnout za horizont)
+        if not is_archived_month(suggestion.datum) and not reading_exists(db, suggestion.datum):
             # Vytvoření nového záznamu
             new_record = Spotreba(
                 datum=suggestion.datum,
@@ -119,18 +144,8 @@ async def create_missing_data_suggestions(db: Session = Depends(get_db)):
             db.add(new_record)
             created_count += 1
     
-    try:
-        db.commit()
-    except Exception:
-        db.rollback()
-        logger.exception("Chyba při hromadném vytváření chybějících záznamů")
-        raise HTTPException(status_code=500, detail="Chyba při ukládání do databáze")
-    
-    logger.info("Hromadně vytvořeno %d chybějících záznamů", created_count)
-    return {
-        "message": f"Bylo vytvořeno {created_count} chybějících záznamů",
-        "created": created_count
-    }
+    db.commit()
+    return created_count
 
 @router.post("/missing-data/create-single")
 async def create_single_missing_data(
@@ -139,9 +154,11 @@ async def create_single_missing_data(
 ):
     """Vytvoření jednoho konkrétního chybějícího záznamu"""
     
+    if is_archived_month(suggestion.datum):
+        raise HTTPException(status_code=400, detail=ARCHIVED_MONTH_DETAIL)
+    
     # Kontrola, zda už neexistuje záznam pro toto datum
-    existing = db.query(Spotreba).filter(Spotreba.datum == suggestion.datum).first()
-    if existing:
+    if reading_exists(db, suggestion.datum):
         raise HTTPException(status_code=400, detail="Záznam pro toto datum již existuje")
     
     # Vytvoření nového záznamu
@@ -163,6 +180,7 @@ async def create_single_missing_data(
         logger.exception("Chyba při vytváření chybějícího záznamu pro datum=%s", suggestion.datum)
         raise HTTPException(status_code=500, detail="Chyba při ukládání do databáze")
     
+    mark_data_changed()
     logger.info("Vytvořen chybějící záznam id=%s, datum=%s", new_record.id, new_record.datum)
     return {
         "message": "Záznam byl úspěšně vytvořen",
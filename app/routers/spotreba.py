@@ -1,14 +1,16 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from fastapi.params import Query
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
 from typing import List, Optional
-from datetime import date, timedelta
+from ..coalescing import mark_data_changed
 from ..database import get_db
 from ..models import Spotreba
-from ..schemas import SpotrebaCreate, SpotrebaUpdate, SpotrebaResponse, SpotrebaWithDiff
+from ..storage import (
+    ARCHIVED_MONTH_DETAIL, count_readings, fetch_readings, get_archived, is_archived_month, reading_exists,
+)
+from ..schemas import SpotrebaCreate, SpotrebaUpdate, SpotrebaResponse, SpotrebaWithDiff, SPOTREBA_WITH_DIFF_LIST
 
 logger = logging.getLogger(__name__)
 
@@ -22,45 +24,45 @@ async def get_spotreba_list(
     source_filter: Optional[bool] = Query(None, description="Filtr podle zdroje dat: None=all, False=manuální, True=automatické")
 ):
     """Získání seznamu záznamů spotřeby s vypočítanými rozdíly"""
-    
-    # Základní dotaz
-    query = db.query(Spotreba)
-    
-    # Aplikace filtru podle zdroje dat
-    if source_filter is not None:
-        query = query.filter(Spotreba.source == source_filter)
-    
-    # Seřazení podle data (nejnovější první) a omezení počtu s offsetem
-    spotreba_records = query.order_by(desc(Spotreba.datum)).offset(offset).limit(limit).all()
-    
-    # Převod na response model s vypočítanými rozdíly
-    result = []
-    for i, record in enumerate(spotreba_records):
-        record_dict = {
-            "id": record.id,
-            "datum": record.datum,
-            "elektromer_vysoky": record.elektromer_vysoky,
-            "elektromer_nizky": record.elektromer_nizky,
-            "plynomer": record.plynomer,
-            "vodomer": record.vodomer,
-            "source": record.source,
-            "diff_elektromer_vysoky": None,
-            "diff_elektromer_nizky": None,
-            "diff_plynomer": None,
-            "diff_vodomer": None
-        }
-        
-        # Výpočet rozdílů s předchozím záznamem
-        if i < len(spotreba_records) - 1:
-            prev_record = spotreba_records[i + 1]
-            record_dict["diff_elektromer_vysoky"] = record.elektromer_vysoky - prev_record.elektromer_vysoky
-            record_dict["diff_elektromer_nizky"] = record.elektromer_nizky - prev_record.elektromer_nizky
-            record_dict["diff_plynomer"] = record.plynomer - prev_record.plynomer
-            record_dict["diff_vodomer"] = record.vodomer - prev_record.vodomer
-        
-        result.append(SpotrebaWithDiff(**record_dict))
-    
-    return result
+    rows = fetch_spotreba_rows(db, limit=limit, offset=offset, source_filter=source_filter)
+    # Řádky už prošly validací, serializují se rovnou do JSON bez druhé validace přes response_model
+    return Response(content=SPOTREBA_WITH_DIFF_LIST.dump_json(rows), media_type="application/json")
+
+def fetch_spotreba_rows(
+    db: Session,
+    limit: Optional[int] = 12,
+    offset: int = 0,
+    source_filter: Optional[bool] = None,
+) -> List[SpotrebaWithDiff]:
+    """Načtení záznamů s vypočítanými rozdíly bez hydratace ORM objektů (limit=None = všechny)"""
+    
+    # Prosté řádky z horké tabulky i archivu, nejnovější první, s filtrem podle zdroje dat
+    rows = fetch_readings(db, source=source_filter, newest_first=True, limit=limit, offset=offset)
+    
+    # Výpočet rozdílů s předchozím (starším) záznamem
+    records = []
+    for i, row in enumerate(rows):
+        record = row._asdict()
+        if i < len(rows) - 1:
+            prev = rows[i + 1]
+            record["diff_elektromer_vysoky"] = row.elektromer_vysoky - prev.elektromer_vysoky
+            record["diff_elektromer_nizky"] = row.elektromer_nizky - prev.elektromer_nizky
+            record["diff_plynomer"] = row.plynomer - prev.plynomer
+            record["diff_vodomer"] = row.vodomer - prev.vodomer
+        records.append(record)
+    
+    # Jediná validace celého seznamu předkompilovaným validátorem
+    return SPOTREBA_WITH_DIFF_LIST.validate_python(records)
+
+def _get_editable(db: Session, spotreba_id: int) -> Spotreba:
+    """Záznam z horké tabulky; archivované záznamy jsou jen pro čtení"""
+    # Zámek řádku - úprava se serializuje s případným přesunem záznamu do archivu
+    db_spotreba = db.query(Spotreba).filter(Spotreba.id == spotreba_id).with_for_update().first()
+    if db_spotreba:
+        return db_spotreba
+    if get_archived(db, spotreba_id):
+        raise HTTPException(status_code=400, detail="Archivovaný záznam nelze měnit")
+    raise HTTPException(status_code=404, detail="Záznam spotřeby nebyl nalezen")
 
 @router.get("/spotreba/count")
 async def get_spotreba_count(
@@ -69,22 +71,15 @@ async def get_spotreba_count(
 ):
     """Získání celkového počtu záznamů spotřeby"""
     
-    # Základní dotaz
-    query = db.query(Spotreba)
-    
-    # Aplikace filtru podle zdroje dat
-    if source_filter is not None:
-        query = query.filter(Spotreba.source == source_filter)
-    
-    # Počet záznamů
-    count = query.count()
+    # Počet záznamů v obou vrstvách s filtrem podle zdroje dat
+    count = count_readings(db, source=source_filter)
     
     return {"count": count}
 
 @router.get("/spotreba/{spotreba_id}", response_model=SpotrebaResponse)
 async def get_spotreba(spotreba_id: int, db: Session = Depends(get_db)):
     """Získání konkrétního záznamu spotřeby"""
-    spotreba = db.query(Spotreba).filter(Spotreba.id == spotreba_id).first()
+    spotreba = db.query(Spotreba).filter(Spotreba.id == spotreba_id).first() or get_archived(db, spotreba_id)
     if not spotreba:
         raise HTTPException(status_code=404, detail="Záznam spotřeby nebyl nalezen")
     return spotreba
@@ -93,12 +88,14 @@ async def get_spotreba(spotreba_id: int, db: Session = Depends(get_db)):
 async def create_spotreba(spotreba: SpotrebaCreate, db: Session = Depends(get_db)):
     """Vytvoření nového záznamu spotřeby"""
     
-    # Kontrola, zda už existuje záznam pro dané datum
-    existing = db.query(Spotreba).filter(Spotreba.datum == spotreba.datum).first()
-    if existing:
+    if is_archived_month(spotreba.datum):
+        raise HTTPException(status_code=400, detail=ARCHIVED_MONTH_DETAIL)
+    
+    # Kontrola, zda už existuje záznam pro dané datum (i v archivu)
+    if reading_exists(db, spotreba.datum):
         raise HTTPException(status_code=400, detail="Záznam pro toto datum již existuje")
     
-    db_spotreba = Spotreba(**spotreba.dict())
+    db_spotreba = Spotreba(**spotreba.model_dump())
     db.add(db_spotreba)
     try:
         db.commit()
@@ -108,6 +105,7 @@ async def create_spotreba(spotreba: SpotrebaCreate, db: Session = Depends(get_db
         logger.exception("Chyba při vytváření záznamu")
         raise HTTPException(status_code=500, detail="Chyba při ukládání do databáze")
     
+    mark_data_changed()
     logger.info("Vytvořen záznam id=%s, datum=%s", db_spotreba.id, db_spotreba.datum)
     return db_spotreba
 
@@ -120,19 +118,18 @@ async def update_spotreba(
     """Aktualizace záznamu spotřeby"""
     
     # Najít existující záznam
-    db_spotreba = db.query(Spotreba).filter(Spotreba.id == spotreba_id).first()
-    if not db_spotreba:
-        raise HTTPException(status_code=404, detail="Záznam spotřeby nebyl nalezen")
+    db_spotreba = _get_editable(db, spotreba_id)
+    
+    # Odečet z archivovaného měsíce (i přesunutý do něj změnou data) by zhuštění zahodilo
+    if is_archived_month(spotreba_update.datum or db_spotreba.datum):
+        raise HTTPException(status_code=400, detail=ARCHIVED_MONTH_DETAIL)
     
     # Kontrola, zda nové datum nekonfliktuje s existujícím záznamem
     if spotreba_update.datum and spotreba_update.datum != db_spotreba.datum:
-        existing = db.query(Spotreba).filter(
-            and_(Spotreba.datum == spotreba_update.datum, Spotreba.id != spotreba_id)
-        ).first()
-        if existing:
+        if reading_exists(db, spotreba_update.datum, exclude_id=spotreba_id):
             raise HTTPException(status_code=400, detail="Záznam pro toto datum již existuje")
     
-    update_data = spotreba_update.dict(exclude_unset=True)
+    update_data = spotreba_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_spotreba, field, value)
     
@@ -144,6 +141,7 @@ async def update_spotreba(
         logger.exception("Chyba při aktualizaci záznamu id=%s", spotreba_id)
         raise HTTPException(status_code=500, detail="Chyba při ukládání do databáze")
     
+    mark_data_changed()
     logger.info("Aktualizován záznam id=%s", spotreba_id)
     return db_spotreba
 
@@ -151,9 +149,7 @@ async def update_spotreba(
 async def delete_spotreba(spotreba_id: int, db: Session = Depends(get_db)):
     """Smazání záznamu spotřeby"""
     
-    db_spotreba = db.query(Spotreba).filter(Spotreba.id == spotreba_id).first()
-    if not db_spotreba:
-        raise HTTPException(status_code=404, detail="Záznam spotřeby nebyl nalezen")
+    db_spotreba = _get_editable(db, spotreba_id)
     
     db.delete(db_spotreba)
     try:
@@ -163,5 +159,6 @@ async def delete_spotreba(spotreba_id: int, db: Session = Depends(get_db)):
         logger.exception("Chyba při mazání záznamu id=%s", spotreba_id)
         raise HTTPException(status_code=500, detail="Chyba při mazání z databáze")
     
+    mark_data_changed()
     logger.info("Smazán záznam id=%s", spotreba_id)
     return {"message": "Záznam byl úspěšně smazán"}
@@ -0,0 +1,201 @@
+"""In-process plánovač úloh běžících mimo obsluhu požadavků.
+
+Úlohy běží ve threadpoolu s vlastní databázovou session. Periodické
+úlohy se spouštějí v pevném intervalu, úlohy vázané na změnu dat se
+spustí až ve chvíli, kdy se verze dat po zápisu ustálí (debouncing),
+a volitelně i v pevném intervalu.
+Hotové výsledky se ukládají spolu s verzí dat, dnem a časem výpočtu a
+požadavky je čtou jen tehdy, pokud odpovídají aktuální verzi, vznikly
+dnes a nejsou starší než jejich maximální stáří. Verze dat je lokální
+pro proces - zápisy z jiných procesů zachytí jen maximální stáří.
+"""
+import asyncio
+import logging
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from .coalescing import current_data_version
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Jak často úlohy vázané na změnu dat kontrolují verzi dat (v sekundách)
+_POLL_INTERVAL = 0.5
+
+
+class Job:
+    """Registrovaná úloha a stav jejích běhů"""
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[Session], Any],
+        interval: Optional[float] = None,
+        debounce: Optional[float] = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.debounce = debounce
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last_started: Optional[datetime] = None
+        self.last_finished: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.total_duration_ms = 0.0
+        self.last_error: Optional[str] = None
+        self.last_result: Any = None
+        self.last_data_version: Optional[int] = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trigger": "+".join(
+                name for name, enabled in (("data_change", self.debounce), ("interval", self.interval)) if enabled
+            ),
+            "interval_seconds": self.interval,
+            "debounce_seconds": self.debounce,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_started": self.last_started,
+            "last_finished": self.last_finished,
+            "last_duration_ms": self.last_duration_ms,
+            "avg_duration_ms": round(self.total_duration_ms / self.runs, 2) if self.runs else None,
+            "last_error": self.last_error,
+            "last_result": self.last_result,
+            "last_data_version": self.last_data_version,
+        }
+
+
+class JobScheduler:
+    """Plánovač úloh spouštěný z lifespanu FastAPI aplikace"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._results: Dict[Tuple, Tuple[int, date, float, Any]] = {}
+
+    def register(
+        self,
+        name: str,
+        fn: Callable[[Session], Any],
+        interval: Optional[float] = None,
+        debounce: Optional[float] = None,
+    ) -> None:
+        """Registrace úlohy - periodické (`interval`), spouštěné po změně dat (`debounce`), nebo obojí"""
+        if interval is None and debounce is None:
+            raise ValueError("Úloha musí mít nastavený interval nebo debounce")
+        self._jobs[name] = Job(name, fn, interval=interval, debounce=debounce)
+        self._locks[name] = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        for job in self._jobs.values():
+            loop_fn = self._data_change_loop if job.debounce is not None else self._interval_loop
+            self._tasks.append(asyncio.create_task(loop_fn(job), name=f"job:{job.name}"))
+        logger.info("Plánovač spuštěn s úlohami: %s", ", ".join(self._jobs) or "-")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        logger.info("Plánovač zastaven")
+
+    async def run_job(self, name: str) -> Job:
+        """Okamžité spuštění úlohy; souběžné běhy téže úlohy se serializují"""
+        job = self._jobs[name]
+        async with self._locks[name]:
+            job.running = True
+            job.last_started = datetime.now()
+            version = current_data_version()
+            started = time.perf_counter()
+            try:
+                job.last_result = await run_in_threadpool(self._execute, job.fn)
+                job.last_error = None
+                job.last_data_version = version
+            except Exception as exc:
+                job.failures += 1
+                job.last_error = repr(exc)
+                logger.exception("Úloha %s selhala", name)
+            finally:
+                duration = (time.perf_counter() - started) * 1000
+                job.runs += 1
+                job.running = False
+                job.last_finished = datetime.now()
+                job.last_duration_ms = round(duration, 2)
+                job.total_duration_ms += duration
+        return job
+
+    async def _interval_loop(self, job: Job) -> None:
+        while True:
+            await self.run_job(job.name)
+            await asyncio.sleep(job.interval)
+
+    async def _data_change_loop(self, job: Job) -> None:
+        loop = asyncio.get_running_loop()
+        seen_version, seen_at = None, 0.0
+        last_run = loop.time()
+        while True:
+            version = current_data_version()
+            if version != job.last_data_version:
+                if version != seen_version:
+                    seen_version, seen_at = version, loop.time()
+                elif loop.time() - seen_at >= job.debounce:
+                    await self.run_job(job.name)
+                    # Neúspěšný běh se zopakuje nejdříve po dalším debounce
+                    last_run = seen_at = loop.time()
+            # Pravidelný přepočet i bez změny verze (posun data, zápisy z jiných procesů)
+            elif job.interval and loop.time() - last_run >= job.interval:
+                await self.run_job(job.name)
+                last_run = loop.time()
+            await asyncio.sleep(_POLL_INTERVAL)
+
+    @staticmethod
+    def _execute(fn: Callable[[Session], Any]) -> Any:
+        db = SessionLocal()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+
+    def publish(
+        self, route: str, params: Dict[str, Hashable], value: Any, version: int, max_age: float
+    ) -> None:
+        """Uložení předpočítaného výsledku spočítaného nad danou verzí dat
+
+        `max_age` (v sekundách) omezuje, jak dlouho se výsledek smí vracet;
+        chrání před zápisy, které verzi dat v tomto procesu nezvýšily.
+        """
+        key = (route, tuple(sorted(params.items())))
+        self._results[key] = (version, date.today(), time.monotonic() + max_age, value)
+
+    def cached(self, route: str, params: Dict[str, Hashable]) -> Optional[Any]:
+        """Předpočítaný výsledek, pokud odpovídá aktuální verzi dat, vznikl dnes a nevypršel, jinak None"""
+        entry = self._results.get((route, tuple(sorted(params.items()))))
+        if entry is None:
+            return None
+        version, computed_on, expires_at, value = entry
+        # Okna grafů (poslední rok apod.) závisí na dnešním datu
+        if version != current_data_version() or computed_on != date.today() or time.monotonic() >= expires_at:
+            return None
+        return value
+
+    def jobs(self) -> List[Job]:
+        return list(self._jobs.values())
+
+    def get(self, name: str) -> Optional[Job]:
+        return self._jobs.get(name)
+
+
+scheduler = JobScheduler()
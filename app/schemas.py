@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, field_validator
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 
 MAX_METER_VALUE = 9_999_999.99
 
@@ -13,7 +13,8 @@ class SpotrebaBase(BaseModel):
     vodomer: float = Field(..., ge=0, le=MAX_METER_VALUE, description="Stav vodoměru v m³")
     source: bool = Field(default=False, description="Zdroj dat: False = manuální, True = automaticky doplněné")
 
-    @validator('datum')
+    @field_validator('datum')
+    @classmethod
     def validate_datum(cls, v):
         if v > date.today():
             raise ValueError('Datum nesmí být v budoucnosti')
@@ -34,7 +35,8 @@ class SpotrebaUpdate(BaseModel):
     vodomer: Optional[float] = Field(None, ge=0, le=MAX_METER_VALUE)
     source: Optional[bool] = None
 
-    @validator('datum')
+    @field_validator('datum')
+    @classmethod
     def validate_datum(cls, v):
         if v is not None and v > date.today():
             raise ValueError('Datum nesmí být v budoucnosti')
@@ -44,10 +46,9 @@ class SpotrebaUpdate(BaseModel):
 
 class SpotrebaResponse(SpotrebaBase):
     """Schéma pro odpověď s daty spotřeby"""
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
-    
-    class Config:
-        from_attributes = True
 
 class SpotrebaWithDiff(SpotrebaResponse):
     """Schéma pro spotřebu s vypočítanými rozdíly"""
@@ -73,3 +74,6 @@ class ChartData(BaseModel):
     plynomer: list[float]
     vodomer: list[float]
     source_flags: list[bool]  # Označení zdroje dat pro každý měsíc
+
+# Předkompilované validátory pro rychlou serializaci seznamů přímo do JSON
+SPOTREBA_WITH_DIFF_LIST = TypeAdapter(List[SpotrebaWithDiff])
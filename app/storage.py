@@ -0,0 +1,215 @@
+"""Dvouvrstvé úložiště odečtů: horká tabulka `spotreba` a archiv `spotreba_archiv`.
+
+Odečty starší než nastavený horizont se zhušťují na hraniční odečty
+jednotlivých měsíců (první a poslední odečet v měsíci) a přesouvají do
+archivu. Čtecí dotazy procházejí obě vrstvy přes `fetch_readings`, takže
+pro routery je rozdělení transparentní; filtry, řazení i limit se
+propisují do obou větví, aby se horká tabulka ani archiv neprocházely
+celé, když to dotaz nevyžaduje.
+
+Archiv má vlastní primární klíč (původní id je ve sloupci `original_id`).
+Navenek mají archivované odečty záporné id, takže se nikdy nepotkají
+s id horké tabulky, ani když databáze id po smazání znovu použije.
+
+Archivní tabulka se vytváří při startu jen při zapnuté retenci. Bez ní
+se archiv čte pouze tehdy, pokud tabulka v databázi už existuje (data
+z dřívějšího provozu s retencí), jinak se čte jen horká tabulka.
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, inspect, select, union_all
+from sqlalchemy.engine import Engine, Row
+from sqlalchemy.orm import Session
+
+from .models import Spotreba, SpotrebaArchiv
+
+logger = logging.getLogger(__name__)
+
+READING_COLUMNS = ("id", "datum", "elektromer_vysoky", "elektromer_nizky", "plynomer", "vodomer", "source")
+
+# Stáří odečtů v měsících, po kterém se zhušťují do archivu (0 = vypnuto)
+RETENTION_MONTHS = int(os.getenv("RETENTION_MONTHS", "0"))
+
+# Chybová hláška pro zápisy odečtů z měsíců, které už patří do archivu
+ARCHIVED_MONTH_DETAIL = "Odečty z archivovaných měsíců nelze zadávat ani měnit"
+
+# Zda archivní tabulka existuje; None = dosud nezjištěno (zjistí se při prvním dotazu)
+_archive_available: Optional[bool] = None
+
+
+def prepare_archive(engine: Engine) -> None:
+    """Vytvoření archivní tabulky při zapnuté retenci - chyba musí zastavit start aplikace"""
+    global _archive_available
+    SpotrebaArchiv.__table__.create(bind=engine, checkfirst=True)
+    _archive_available = True
+
+
+def _archive_exists(db: Session) -> bool:
+    global _archive_available
+    if _archive_available is None:
+        _archive_available = inspect(db.connection()).has_table(SpotrebaArchiv.__tablename__)
+    return _archive_available
+
+
+def _tiers(db: Session) -> tuple:
+    return (Spotreba, SpotrebaArchiv) if _archive_exists(db) else (Spotreba,)
+
+
+def _reading_id(model):
+    return -SpotrebaArchiv.id if model is SpotrebaArchiv else model.id
+
+
+def _tier_select(model, since: Optional[date], source: Optional[bool]):
+    query = select(*(
+        _reading_id(model).label(name) if name == "id" else getattr(model, name) for name in READING_COLUMNS
+    ))
+    if since is not None:
+        query = query.where(model.datum >= since)
+    if source is not None:
+        query = query.where(model.source == source)
+    return query
+
+
+def fetch_readings(
+    db: Session,
+    since: Optional[date] = None,
+    source: Optional[bool] = None,
+    newest_first: bool = False,
+    limit: Optional[int] = None,
+    offset: int = 0,
+) -> List[Row]:
+    """Odečty z obou vrstev jako prosté řádky seřazené podle data"""
+    window = None if limit is None else offset + limit
+    branches = []
+    for model in _tiers(db):
+        branch = _tier_select(model, since, source)
+        if window is not None:
+            # Každá vrstva vrátí nejvýš offset + limit řádků; obalení do poddotazu
+            # kvůli databázím, které nepovolují LIMIT přímo ve větvi UNION
+            order = model.datum.desc() if newest_first else model.datum.asc()
+            branch = select(branch.order_by(order).limit(window).subquery())
+        branches.append(branch)
+
+    readings = union_all(*branches).subquery("readings")
+    query = select(readings).order_by(
+        readings.c.datum.desc() if newest_first else readings.c.datum.asc()
+    ).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    return db.execute(query).all()
+
+
+def count_readings(db: Session, source: Optional[bool] = None) -> int:
+    """Počet odečtů v obou vrstvách"""
+    return sum(
+        db.execute(select(func.count()).select_from(_tier_select(model, None, source).subquery())).scalar()
+        for model in _tiers(db)
+    )
+
+
+def reading_exists(db: Session, datum: date, exclude_id: Optional[int] = None) -> bool:
+    """Kontrola, zda pro dané datum existuje odečet v kterékoli vrstvě"""
+    for model in _tiers(db):
+        query = select(_reading_id(model)).where(model.datum == datum)
+        if exclude_id is not None:
+            query = query.where(_reading_id(model) != exclude_id)
+        if db.execute(query.limit(1)).first() is not None:
+            return True
+    return False
+
+
+def get_archived(db: Session, reading_id: int) -> Optional[Row]:
+    """Archivovaný odečet podle id z API (záporné), případně podle původního id z horké tabulky"""
+    if not _archive_exists(db):
+        return None
+    query = _tier_select(SpotrebaArchiv, None, None)
+    if reading_id < 0:
+        query = query.where(SpotrebaArchiv.id == -reading_id)
+    else:
+        # Původní id se mohlo opakovat - přednost má naposledy archivovaný odečet
+        query = query.where(SpotrebaArchiv.original_id == reading_id).order_by(SpotrebaArchiv.id.desc())
+    return db.execute(query.limit(1)).first()
+
+
+def compact_readings(db: Session, horizon: date) -> Dict[str, Any]:
+    """Přesun odečtů starších než `horizon` do archivu zhuštěných na hraniční odečty měsíců
+
+    Měsíce, které už v archivu jsou (např. po zpětném doplnění starých dat),
+    se zhušťují znovu společně s archivovanými odečty.
+    """
+    # Zámek přesouvaných řádků - souběžná úprava počká na dokončení přesunu (a pak
+    # dostane 400 "archivovaný záznam"), nebo přesun počká na její commit a přečte nová data
+    raw_rows = db.execute(
+        _tier_select(Spotreba, None, None)
+        .where(Spotreba.datum < horizon)
+        .order_by(Spotreba.datum.asc())
+        .with_for_update()
+    ).all()
+    if not raw_rows:
+        return {"horizon": horizon, "moved": 0, "archived": 0, "dropped": 0}
+
+    archived_rows = db.execute(
+        _tier_select(SpotrebaArchiv, raw_rows[0].datum.replace(day=1), None)
+        .where(SpotrebaArchiv.datum < horizon)
+        .order_by(SpotrebaArchiv.datum.asc())
+    ).all()
+
+    by_month: Dict[tuple, List[Row]] = defaultdict(list)
+    touched_months = {(r.datum.year, r.datum.month) for r in raw_rows}
+    for row in archived_rows:
+        if (row.datum.year, row.datum.month) in touched_months:
+            by_month[(row.datum.year, row.datum.month)].append(row)
+    for row in raw_rows:
+        by_month[(row.datum.year, row.datum.month)].append(row)
+
+    # Z každého měsíce zůstane první a poslední odečet (archivované mají záporné id,
+    # takže se s id z horké tabulky nepletou)
+    keep_ids = set()
+    for rows in by_month.values():
+        rows.sort(key=lambda r: r.datum)
+        keep_ids.update((rows[0].id, rows[-1].id))
+
+    raw_ids = {r.id for r in raw_rows}
+    to_archive = []
+    for row in raw_rows:
+        if row.id in keep_ids:
+            values = row._asdict()
+            values["original_id"] = values.pop("id")
+            to_archive.append(values)
+    archive_drop = [-r.id for rows in by_month.values() for r in rows if r.id < 0 and r.id not in keep_ids]
+
+    if to_archive:
+        db.execute(insert(SpotrebaArchiv), to_archive)
+    if archive_drop:
+        db.execute(delete(SpotrebaArchiv).where(SpotrebaArchiv.id.in_(archive_drop)))
+    db.execute(delete(Spotreba).where(Spotreba.id.in_(raw_ids)))
+    db.commit()
+
+    result = {
+        "horizon": horizon,
+        "moved": len(raw_rows),
+        "archived": len(to_archive),
+        "dropped": len(raw_rows) - len(to_archive) + len(archive_drop),
+    }
+    logger.info(
+        "Zhuštění do archivu (horizont %s): přesunuto %d, archivováno %d, vypuštěno %d odečtů",
+        horizon, result["moved"], result["archived"], result["dropped"],
+    )
+    return result
+
+
+def retention_horizon(today: date, months: int) -> date:
+    """První den měsíce `months` měsíců zpět - archivují se vždy celé měsíce"""
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    return date(year, month + 1, 1)
+
+
+def is_archived_month(datum: date) -> bool:
+    """Zda datum spadá před horizont archivace - takový odečet by příští zhuštění zahodilo"""
+    if RETENTION_MONTHS <= 0:
+        return False
+    return datum < retention_horizon(date.today(), RETENTION_MONTHS)
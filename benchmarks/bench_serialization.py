@@ -0,0 +1,163 @@
+"""Micro-benchmark serializace řádků: původní ORM cesta vs. rychlá cesta přes Core select.
+
+Měří cenu na jeden řádek pro seznam záznamů, data grafů a export celé historie
+(export = celý seznam s rozdíly bez stránkování). Běží nad SQLite v paměti,
+takže nepotřebuje MySQL a měří jen práci aplikace, ne síť.
+
+Spuštění z kořene repozitáře:
+
+    python benchmarks/bench_serialization.py --rows 5000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+# app.database vyžaduje DB proměnné; skutečné spojení se nahradí SQLite níže
+for _var, _value in (("DB_HOST", "localhost"), ("DB_PORT", "3306"), ("DB_DATABASE", "benchmark"),
+                     ("DB_USER", "benchmark"), ("DB_PASSWORD", "benchmark")):
+    os.environ.setdefault(_var, _value)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from sqlalchemy import create_engine, desc  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from typing import List  # noqa: E402
+
+from app.database import Base, SessionLocal  # noqa: E402
+from app.models import Spotreba  # noqa: E402
+from app.routers.grafy import compute_chart_data  # noqa: E402
+from app.routers.spotreba import fetch_spotreba_rows  # noqa: E402
+from app.schemas import ChartData, SpotrebaWithDiff, SPOTREBA_WITH_DIFF_LIST  # noqa: E402
+
+LIST_FIELD = create_response_field(name="list", type_=List[SpotrebaWithDiff])
+CHART_FIELD = create_response_field(name="chart", type_=ChartData)
+
+
+def seed(rows: int) -> None:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SessionLocal.configure(bind=engine)
+    Base.metadata.create_all(engine)
+    start = date.today() - timedelta(days=rows)
+    db = SessionLocal()
+    db.add_all(
+        Spotreba(
+            datum=start + timedelta(days=i),
+            elektromer_vysoky=1000 + i * 7.5,
+            elektromer_nizky=500 + i * 3.25,
+            plynomer=200 + i * 1.1,
+            vodomer=50 + i * 0.3,
+            source=i % 5 == 0,
+        )
+        for i in range(rows)
+    )
+    db.commit()
+    db.close()
+
+
+def legacy_list(db, limit):
+    """Původní implementace: ORM objekty -> dict -> SpotrebaWithDiff -> validace přes response_model"""
+    query = db.query(Spotreba).order_by(desc(Spotreba.datum))
+    if limit is not None:
+        query = query.limit(limit)
+    records = query.all()
+    result = []
+    for i, record in enumerate(records):
+        record_dict = {
+            "id": record.id,
+            "datum": record.datum,
+            "elektromer_vysoky": record.elektromer_vysoky,
+            "elektromer_nizky": record.elektromer_nizky,
+            "plynomer": record.plynomer,
+            "vodomer": record.vodomer,
+            "source": record.source,
+            "diff_elektromer_vysoky": None,
+            "diff_elektromer_nizky": None,
+            "diff_plynomer": None,
+            "diff_vodomer": None,
+        }
+        if i < len(records) - 1:
+            prev = records[i + 1]
+            record_dict["diff_elektromer_vysoky"] = record.elektromer_vysoky - prev.elektromer_vysoky
+            record_dict["diff_elektromer_nizky"] = record.elektromer_nizky - prev.elektromer_nizky
+            record_dict["diff_plynomer"] = record.plynomer - prev.plynomer
+            record_dict["diff_vodomer"] = record.vodomer - prev.vodomer
+        result.append(SpotrebaWithDiff(**record_dict))
+    content = asyncio.run(serialize_response(field=LIST_FIELD, response_content=result))
+    return json.dumps(content).encode()
+
+
+def legacy_chart(db):
+    """Původní implementace: ORM objekty -> ChartData -> validace přes response_model"""
+    records = sorted(db.query(Spotreba).order_by(Spotreba.datum.desc()).all(), key=lambda r: r.datum)
+    chart = ChartData(
+        labels=[r.datum.strftime('%d.%m.%Y') for r in records],
+        elektromer_vysoky=[r.elektromer_vysoky for r in records],
+        elektromer_nizky=[r.elektromer_nizky for r in records],
+        plynomer=[r.plynomer for r in records],
+        vodomer=[r.vodomer for r in records],
+        source_flags=[r.source for r in records],
+    )
+    content = asyncio.run(serialize_response(field=CHART_FIELD, response_content=chart))
+    return json.dumps(content).encode()
+
+
+def fast_list(db, limit):
+    return SPOTREBA_WITH_DIFF_LIST.dump_json(fetch_spotreba_rows(db, limit=limit))
+
+
+def fast_chart(db):
+    return compute_chart_data(db, "all").model_dump_json().encode()
+
+
+def measure(fn, repeat):
+    db = SessionLocal()
+    try:
+        fn(db)  # zahřátí
+        timings = []
+        for _ in range(repeat):
+            db.expunge_all()
+            started = time.perf_counter()
+            fn(db)
+            timings.append(time.perf_counter() - started)
+    finally:
+        db.close()
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000, help="Počet řádků v testovací tabulce")
+    parser.add_argument("--page", type=int, default=100, help="Velikost stránky seznamu")
+    parser.add_argument("--repeat", type=int, default=20, help="Počet opakování (bere se nejlepší čas)")
+    args = parser.parse_args()
+
+    seed(args.rows)
+    cases = [
+        ("list", args.page, lambda db: legacy_list(db, args.page), lambda db: fast_list(db, args.page)),
+        ("chart", args.rows, legacy_chart, fast_chart),
+        ("export", args.rows, lambda db: legacy_list(db, None), lambda db: fast_list(db, None)),
+    ]
+
+    # Obě cesty musí vracet stejný JSON
+    db = SessionLocal()
+    for name, _, before, after in cases:
+        assert json.loads(before(db)) == json.loads(after(db)), f"Rozdílný výstup: {name}"
+    db.close()
+
+    print(f"{'případ':<8} {'řádků':>7} {'před µs/řádek':>15} {'po µs/řádek':>13} {'zrychlení':>10}")
+    for name, rows, before, after in cases:
+        before_s = measure(before, args.repeat)
+        after_s = measure(after, args.repeat)
+        print(
+            f"{name:<8} {rows:>7} {before_s / rows * 1e6:>15.2f} "
+            f"{after_s / rows * 1e6:>13.2f} {before_s / after_s:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
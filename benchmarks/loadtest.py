@@ -0,0 +1,478 @@
+"""Zátěžový test aplikace s reálným mixem požadavků.
+
+Virtuální uživatelé souběžně procházejí aplikaci: otevírají přehled
+(stránka + souhrn + počet záznamů), listují stránkovaným seznamem,
+přepínají období grafů a občas uloží nový záznam přes `POST /api/spotreba`.
+Pro každou úroveň souběžnosti se vypíše propustnost, p50/p95/p99 latence
+a chybovost po endpointech a výsledek se uloží do JSON pro pozdější
+porovnání. Nepotřebuje žádné závislosti mimo standardní knihovnu.
+
+Lokální databáze (MariaDB) a spuštění testu z kořene repozitáře:
+
+    docker compose -f benchmarks/docker-compose.loadtest.yml up -d
+    export DB_HOST=127.0.0.1 DB_PORT=3307 DB_DATABASE=spotreba DB_USER=spotreba DB_PASSWORD=spotreba
+    python benchmarks/loadtest.py run --start-app --create-schema --seed-months 120 \\
+        --concurrency 1,8,32 --duration 30
+
+Porovnání dvou běhů:
+
+    python benchmarks/loadtest.py compare benchmarks/results/A.json benchmarks/results/B.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+CHART_PERIODS = ("year", "2years", "all")
+
+# Váhy scénářů v mixu (zápisy jsou jen občasné)
+DEFAULT_MIX = {"dashboard": 30, "browse": 35, "charts": 33, "write": 2}
+
+# Úklid testovacích záznamů - počet pokusů a prodleva mezi nimi (v sekundách)
+CLEANUP_ATTEMPTS = 3
+CLEANUP_RETRY_DELAY = 1.0
+
+
+class HttpConnection:
+    """Minimální HTTP/1.1 klient s keep-alive nad asyncio streamy"""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: Optional[bytes] = None) -> Tuple[int, bytes]:
+        try:
+            return await asyncio.wait_for(self._request(method, path, body), self.timeout)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _request(self, method: str, path: str, body: Optional[bytes]) -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        head = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Connection: keep-alive"]
+        if body is not None:
+            head += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        self._writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + (body or b""))
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("Server uzavřel spojení")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await self._reader.readline()
+                    break
+                chunks.append(await self._reader.readexactly(size))
+                await self._reader.readline()
+            payload = b"".join(chunks)
+        else:
+            payload = await self._reader.readexactly(int(headers.get("content-length", 0)))
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, payload
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+        self._reader = self._writer = None
+
+
+class Recorder:
+    """Sběr latencí a výsledků po endpointech"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.client_errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, label: str, latency: float, status: Optional[int]) -> None:
+        self.latencies[label].append(latency)
+        if status is None or status >= 500:
+            self.errors[label] += 1
+        elif status >= 400:
+            self.client_errors[label] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Dict[str, float]]:
+        endpoints = {}
+        for label in sorted(self.latencies):
+            samples = sorted(self.latencies[label])
+            count = len(samples)
+            endpoints[label] = {
+                "requests": count,
+                "rps": round(count / elapsed, 2),
+                "errors": self.errors[label],
+                "client_errors": self.client_errors[label],
+                "error_rate": round(self.errors[label] / count, 4),
+                "mean_ms": round(sum(samples) / count * 1000, 2),
+                "p50_ms": round(percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 99) * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+            }
+        return endpoints
+
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Percentil metodou nejbližšího pořadí"""
+    rank = max(1, -(-len(sorted_samples) * pct // 100))
+    return sorted_samples[int(rank) - 1]
+
+
+class VirtualUser:
+    """Jeden souběžný uživatel procházející aplikaci podle mixu scénářů"""
+
+    def __init__(self, conn: HttpConnection, recorder: Recorder, state: "RunState"):
+        self.conn = conn
+        self.recorder = recorder
+        self.state = state
+
+    async def call(self, label: str, method: str, path: str, body: Optional[dict] = None) -> Optional[bytes]:
+        payload = json.dumps(body).encode() if body is not None else None
+        started = time.perf_counter()
+        status, response = None, None
+        try:
+            status, response = await self.conn.request(method, path, payload)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            pass
+        self.recorder.record(label, time.perf_counter() - started, status)
+        return response if status is not None and status < 400 else None
+
+    async def dashboard(self) -> None:
+        await self.call("GET /", "GET", "/")
+        await self.call("GET /api/grafy/summary", "GET", "/api/grafy/summary")
+        await self.call("GET /api/spotreba/count", "GET", "/api/spotreba/count")
+
+    async def browse(self) -> None:
+        pages = max(1, self.state.total_records // 12)
+        offset = random.randrange(pages) * 12
+        await self.call("GET /api/spotreba", "GET", f"/api/spotreba?limit=12&offset={offset}")
+
+    async def charts(self) -> None:
+        period = random.choice(CHART_PERIODS)
+        await self.call(f"GET /api/grafy/data?period={period}", "GET", f"/api/grafy/data?period={period}")
+        if random.random() < 0.25:
+            await self.call("GET /api/grafy/yoy", "GET", "/api/grafy/yoy")
+
+    async def write(self) -> None:
+        body = {
+            "datum": self.state.next_write_date().isoformat(),
+            "elektromer_vysoky": round(random.uniform(0, 50000), 2),
+            "elektromer_nizky": round(random.uniform(0, 50000), 2),
+            "plynomer": round(random.uniform(0, 20000), 2),
+            "vodomer": round(random.uniform(0, 5000), 2),
+            "source": False,
+        }
+        response = await self.call("POST /api/spotreba", "POST", "/api/spotreba", body)
+        if response:
+            self.state.created_ids.append(json.loads(response)["id"])
+
+    async def run(self, deadline: float, mix: Dict[str, int], think: float) -> None:
+        scenarios = list(mix)
+        weights = [mix[name] for name in scenarios]
+        while time.perf_counter() < deadline:
+            await getattr(self, random.choices(scenarios, weights)[0])()
+            if think:
+                await asyncio.sleep(think)
+        await self.conn.close()
+
+
+class RunState:
+    """Sdílený stav běhu - počet záznamů pro stránkování a data pro zápisy"""
+
+    def __init__(self, total_records: int, write_start: date):
+        self.total_records = total_records
+        self.created_ids: List[int] = []
+        self._write_date = write_start
+
+    def next_write_date(self) -> date:
+        # Zápisy jdou po dnech od začátku roku 2000, kde nejsou žádná reálná data
+        self._write_date += timedelta(days=1)
+        return self._write_date
+
+
+async def run_level(host: str, port: int, args, concurrency: int, state: RunState) -> dict:
+    recorder = Recorder()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    users = [
+        VirtualUser(HttpConnection(host, port, args.timeout), recorder, state)
+        for _ in range(concurrency)
+    ]
+    await asyncio.gather(*(user.run(deadline, args.mix, args.think_ms / 1000) for user in users))
+    elapsed = time.perf_counter() - started
+
+    endpoints = recorder.summary(elapsed)
+    total = sum(e["requests"] for e in endpoints.values())
+    errors = sum(e["errors"] for e in endpoints.values())
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+async def cleanup(host: str, port: int, state: RunState, timeout: float) -> Dict[int, Optional[int]]:
+    """Smazání záznamů vytvořených během testu; vrací nesmazaná id s posledním HTTP statusem"""
+    conn = HttpConnection(host, port, timeout)
+    pending: Dict[int, Optional[int]] = dict.fromkeys(state.created_ids)
+    for attempt in range(CLEANUP_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(CLEANUP_RETRY_DELAY * attempt)
+        for record_id in list(pending):
+            try:
+                status, _ = await conn.request("DELETE", f"/api/spotreba/{record_id}")
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                status = None
+            # 404 - záznam už neexistuje, uklízet není co
+            if status in (200, 404):
+                del pending[record_id]
+            else:
+                pending[record_id] = status
+        if not pending:
+            break
+    await conn.close()
+    state.created_ids.clear()
+    if pending:
+        details = ", ".join(f"{record_id} ({f'HTTP {status}' if status else 'bez odpovědi'})" for record_id, status in pending.items())
+        print(f"\nNepodařilo se smazat {len(pending)} testovacích záznamů: {details}", file=sys.stderr)
+    return pending
+
+
+async def seed(host: str, port: int, months: int, timeout: float) -> None:
+    """Naplnění databáze měsíčními odečty přes API (existující data se přeskočí)"""
+    conn = HttpConnection(host, port, timeout)
+    today = date.today()
+    year, month = today.year, today.month
+    for i in range(months, 0, -1):
+        y, m = divmod((year * 12 + month - 1) - i, 12)
+        body = {
+            "datum": date(y, m + 1, 1).isoformat(),
+            "elektromer_vysoky": 10000 + (months - i) * 150.0,
+            "elektromer_nizky": 5000 + (months - i) * 80.0,
+            "plynomer": 2000 + (months - i) * 40.0,
+            "vodomer": 500 + (months - i) * 9.0,
+            "source": False,
+        }
+        await conn.request("POST", "/api/spotreba", json.dumps(body).encode())
+    await conn.close()
+
+
+async def wait_for_health(host: str, port: int, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        conn = HttpConnection(host, port, 5)
+        try:
+            status, _ = await conn.request("GET", "/health")
+            if status == 200:
+                return
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            await conn.close()
+        await asyncio.sleep(0.5)
+    raise RuntimeError("Aplikace neodpověděla na /health")
+
+
+async def fetch_count(host: str, port: int, timeout: float) -> int:
+    conn = HttpConnection(host, port, timeout)
+    try:
+        _, payload = await conn.request("GET", "/api/spotreba/count")
+        return json.loads(payload)["count"]
+    finally:
+        await conn.close()
+
+
+def create_schema() -> None:
+    """Vytvoření tabulek v lokální databázi podle modelů aplikace"""
+    sys.path.insert(0, REPO_ROOT)
+    from app.database import Base, engine
+    import app.models  # noqa: F401
+
+    Base.metadata.create_all(engine)
+
+
+def start_app(port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=REPO_ROOT,
+    )
+
+
+async def run(args) -> dict:
+    url = urlsplit(args.base_url)
+    host, port = url.hostname, url.port or 80
+    await wait_for_health(host, port, args.startup_timeout)
+    if args.seed_months:
+        await seed(host, port, args.seed_months, args.timeout)
+
+    state = RunState(await fetch_count(host, port, args.timeout), date(2000, 1, 1))
+    levels = []
+    left_behind: List[int] = []
+    for concurrency in args.concurrency:
+        level = await run_level(host, port, args, concurrency, state)
+        leftover = await cleanup(host, port, state, args.timeout)
+        level["leftover_records"] = len(leftover)
+        left_behind.extend(leftover)
+        print_level(level)
+        levels.append(level)
+
+    print(f"\nTestovacích záznamů ponechaných v databázi: {len(left_behind)}")
+    if left_behind:
+        print(f"  id: {', '.join(map(str, left_behind))} - smažte je ručně (DELETE /api/spotreba/{{id}})")
+
+    return {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "label": args.label,
+        "base_url": args.base_url,
+        "config": {
+            "duration_s": args.duration,
+            "mix": args.mix,
+            "think_ms": args.think_ms,
+            "records": state.total_records,
+        },
+        "levels": levels,
+        "leftover_record_ids": left_behind,
+    }
+
+
+def print_level(level: dict) -> None:
+    print(
+        f"\nsouběžnost {level['concurrency']}: {level['requests']} požadavků, "
+        f"{level['throughput_rps']} req/s, chybovost {level['error_rate'] * 100:.2f} %"
+    )
+    print(f"  {'endpoint':<38} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'chyby':>6}")
+    for label, e in level["endpoints"].items():
+        print(
+            f"  {label:<38} {e['rps']:>8} {e['p50_ms']:>8} {e['p95_ms']:>8} "
+            f"{e['p99_ms']:>8} {e['errors']:>6}"
+        )
+
+
+def compare(path_a: str, path_b: str) -> None:
+    with open(path_a) as f:
+        a = json.load(f)
+    with open(path_b) as f:
+        b = json.load(f)
+
+    def delta(old: float, new: float) -> str:
+        return f"{(new - old) / old * 100:+.1f} %" if old else "-"
+
+    print(f"A: {path_a} ({a.get('label') or a['started']})")
+    print(f"B: {path_b} ({b.get('label') or b['started']})")
+    levels_b = {level["concurrency"]: level for level in b["levels"]}
+    for level_a in a["levels"]:
+        level_b = levels_b.get(level_a["concurrency"])
+        if level_b is None:
+            continue
+        print(
+            f"\nsouběžnost {level_a['concurrency']}: {level_a['throughput_rps']} -> "
+            f"{level_b['throughput_rps']} req/s ({delta(level_a['throughput_rps'], level_b['throughput_rps'])})"
+        )
+        print(f"  {'endpoint':<38} {'p50':>10} {'p95':>10} {'p99':>10} {'chybovost':>16}")
+        for label, ea in level_a["endpoints"].items():
+            eb = level_b["endpoints"].get(label)
+            if eb is None:
+                continue
+            print(
+                f"  {label:<38} {delta(ea['p50_ms'], eb['p50_ms']):>10} {delta(ea['p95_ms'], eb['p95_ms']):>10} "
+                f"{delta(ea['p99_ms'], eb['p99_ms']):>10} {ea['error_rate']:>7.2%} -> {eb['error_rate']:.2%}"
+            )
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, value.split(",")):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Neznámý scénář: {name}")
+        mix[name] = int(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Spuštění zátěžového testu")
+    run_parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    run_parser.add_argument("--start-app", action="store_true",
+                            help="Spustit aplikaci přes uvicorn na portu z --base-url (DB_* z prostředí)")
+    run_parser.add_argument("--create-schema", action="store_true", help="Vytvořit tabulky v lokální databázi")
+    run_parser.add_argument("--seed-months", type=int, default=0, help="Naplnit databázi N měsíčními odečty")
+    run_parser.add_argument("--concurrency", default="1,8,32",
+                            type=lambda v: [int(c) for c in v.split(",")], help="Úrovně souběžnosti")
+    run_parser.add_argument("--duration", type=float, default=30, help="Délka jedné úrovně v sekundách")
+    run_parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX),
+                            help="Váhy scénářů, např. dashboard=30,browse=35,charts=33,write=2")
+    run_parser.add_argument("--think-ms", type=float, default=0, help="Pauza uživatele mezi scénáři")
+    run_parser.add_argument("--timeout", type=float, default=30, help="Timeout jednoho požadavku")
+    run_parser.add_argument("--startup-timeout", type=float, default=60)
+    run_parser.add_argument("--label", default="", help="Popisek běhu uložený do výsledků")
+    run_parser.add_argument("--output", help="Cesta k JSON výsledkům (výchozí benchmarks/results/)")
+
+    compare_parser = sub.add_parser("compare", help="Porovnání dvou uložených běhů")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args.baseline, args.candidate)
+        return
+
+    if args.create_schema:
+        create_schema()
+    app_process = start_app(urlsplit(args.base_url).port or 80) if args.start_app else None
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait(timeout=10)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nVýsledky uloženy do {output}")
+
+
+if __name__ == "__main__":
+    main()
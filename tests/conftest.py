@@ -0,0 +1,27 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+# app.database při importu vyžaduje připojovací údaje; testy běží nad SQLite v paměti
+for _var, _value in (
+    ("DB_HOST", "localhost"), ("DB_PORT", "3306"), ("DB_DATABASE", "test"), ("DB_USER", "test"), ("DB_PASSWORD", "test"),
+):
+    os.environ.setdefault(_var, _value)
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+from app import storage  # noqa: E402
+from app.database import Base, SessionLocal  # noqa: E402
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Session nad prázdnou databází se všemi tabulkami včetně archivu"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(storage, "_archive_available", None)
+    session = SessionLocal(bind=engine)
+    yield session
+    session.close()
+    engine.dispose()
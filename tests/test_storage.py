@@ -0,0 +1,102 @@
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.database import get_db
+from app.models import Spotreba, SpotrebaArchiv
+from app.storage import compact_readings, fetch_readings, retention_horizon
+
+
+def add_readings(db, *readings):
+    for datum, source in readings:
+        db.add(Spotreba(
+            datum=datum, elektromer_vysoky=datum.toordinal() / 1000, elektromer_nizky=1.0,
+            plynomer=1.0, vodomer=1.0, source=source,
+        ))
+    db.commit()
+
+
+def archived(db):
+    return [(r.datum, r.source) for r in db.query(SpotrebaArchiv).order_by(SpotrebaArchiv.datum)]
+
+
+def test_compaction_keeps_first_and_last_reading_of_each_month(db):
+    add_readings(
+        db,
+        (date(2020, 1, 1), False), (date(2020, 1, 10), False), (date(2020, 1, 31), False),
+        (date(2020, 2, 1), False), (date(2020, 2, 15), False), (date(2020, 2, 29), False),
+        (date(2020, 3, 1), False), (date(2020, 3, 15), False),
+    )
+
+    result = compact_readings(db, date(2020, 3, 1))
+
+    assert result == {"horizon": date(2020, 3, 1), "moved": 6, "archived": 4, "dropped": 2}
+    assert [d for d, _ in archived(db)] == [date(2020, 1, 1), date(2020, 1, 31), date(2020, 2, 1), date(2020, 2, 29)]
+    # Měsíc horizontu zůstává v horké tabulce celý
+    assert [r.datum for r in db.query(Spotreba).order_by(Spotreba.datum)] == [date(2020, 3, 1), date(2020, 3, 15)]
+    assert [r.datum.day for r in fetch_readings(db)] == [1, 31, 1, 29, 1, 15]
+
+
+def test_compaction_preserves_source(db):
+    add_readings(db, (date(2020, 1, 1), True), (date(2020, 1, 15), False), (date(2020, 1, 31), False))
+
+    compact_readings(db, date(2020, 2, 1))
+
+    assert archived(db) == [(date(2020, 1, 1), True), (date(2020, 1, 31), False)]
+
+
+def test_backfill_recompacts_archived_month(db):
+    add_readings(db, (date(2020, 1, 10), False), (date(2020, 1, 20), False), (date(2020, 1, 31), False))
+    compact_readings(db, date(2020, 2, 1))
+    assert [d.day for d, _ in archived(db)] == [10, 31]
+
+    # Zpětně doplněný dřívější odečet nahradí archivovaný první odečet měsíce
+    add_readings(db, (date(2020, 1, 5), True), (date(2020, 1, 15), False))
+    result = compact_readings(db, date(2020, 2, 1))
+
+    assert result == {"horizon": date(2020, 2, 1), "moved": 2, "archived": 1, "dropped": 2}
+    assert archived(db) == [(date(2020, 1, 5), True), (date(2020, 1, 31), False)]
+    assert db.query(Spotreba).count() == 0
+
+
+def test_compaction_without_old_readings_is_noop(db):
+    add_readings(db, (date(2020, 3, 1), False))
+
+    assert compact_readings(db, date(2020, 3, 1))["moved"] == 0
+    assert archived(db) == []
+
+
+def test_retention_horizon_uses_whole_months():
+    assert retention_horizon(date(2026, 1, 15), 1) == date(2025, 12, 1)
+    assert retention_horizon(date(2026, 10, 19), 36) == date(2023, 10, 1)
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(storage, "RETENTION_MONTHS", 12)
+    app.dependency_overrides[get_db] = lambda: db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def reading(datum):
+    return {"datum": datum.isoformat(), "elektromer_vysoky": 1, "elektromer_nizky": 1, "plynomer": 1, "vodomer": 1}
+
+
+def test_readings_before_horizon_are_rejected(client, db):
+    horizon = retention_horizon(date.today(), 12)
+    old = date(horizon.year - 1, horizon.month, 1)
+
+    assert client.post("/api/spotreba", json=reading(old)).status_code == 400
+    assert client.post("/api/missing-data/create-single", json={**reading(old), "source": True}).status_code == 400
+
+    created = client.post("/api/spotreba", json=reading(horizon))
+    assert created.status_code == 200
+    # Přesun horkého odečtu do archivovaného měsíce
+    moved = client.put(f"/api/spotreba/{created.json()['id']}", json={"datum": old.isoformat()})
+    assert moved.status_code == 400
+    assert db.query(Spotreba).one().datum == horizon